@@ -0,0 +1,101 @@
+"""Быстрые побайтовые операции, общие для windsurf_decryptor и windsurf_monitor."""
+import re
+import binascii
+
+# Таблица для bytes.translate: непечатаемые байты заменяются на '.'
+_ASCII_TRANS = bytes(b if 32 <= b <= 126 else 0x2E for b in range(256))
+
+# Экранированные байты вида \xNN и таблица всех пар шестнадцатеричных символов
+# (в любом регистре) в готовые однобайтовые значения. Некорректная или обрезанная
+# последовательность \x совпадает без группы и просто удаляется
+_HEX_ESC_RE = re.compile(rb'\\x([0-9a-fA-F]{2})?')
+_HEX_DIGITS = b'0123456789abcdefABCDEF'
+_HEX_PAIRS = {
+    bytes((hi, lo)): bytes((int(chr(hi), 16) << 4 | int(chr(lo), 16),))
+    for hi in _HEX_DIGITS for lo in _HEX_DIGITS
+}
+
+# Маркер клиента ищется прямо в байтах без учета регистра, без копии через lower()
+WINDSURF_RE = re.compile(rb'windsurf', re.IGNORECASE)
+
+# Маркеры полей, для которых разбору нужны первые два вхождения
+_FIELD_MARKERS = (b'$', b'en:', b'R$', b'Program Files')
+
+
+# Символы, обрамляющие введенное сообщение: все пробельные символы Unicode,
+# которые убирает str.strip() (str.isspace), и кавычки
+_TRIM_CHARS = (
+    '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680'
+    '\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a'
+    '\u2028\u2029\u202f\u205f\u3000'
+    '\'"'
+)
+
+
+def strip_quotes(data):
+    """Удаление обрамляющих пробелов и кавычек, в том числе вложенных друг в друга."""
+    return data.strip(_TRIM_CHARS)
+
+
+def _unescape_pair(match):
+    pair = match.group(1)
+    return _HEX_PAIRS[pair] if pair is not None else b''
+
+
+def hex_escape_decode(data):
+    """Преобразование строки с экранированными \\xNN в байты, остальное - буквально.
+
+    Как и раньше, \\x без двух шестнадцатеричных цифр отбрасывается, а следующий
+    за ним текст сохраняется.
+    """
+    return _HEX_ESC_RE.sub(_unescape_pair, data.encode('latin1'))
+
+
+def hex_dump(data, offset=0):
+    """Создание форматированного шестнадцатеричного дампа двоичных данных."""
+    hex_lines = []
+    # Столбец ASCII для всего дампа - одним вызовом translate
+    printable = bytes(data).translate(_ASCII_TRANS).decode('ascii')
+    for i in range(0, len(data), 16):
+        chunk = data[i:i+16]
+        hex_vals = binascii.hexlify(chunk, b' ').decode('ascii')
+        ascii_vals = printable[i:i+16]
+        hex_lines.append(f'{i+offset:04x}: {hex_vals:<48} {ascii_vals}')
+    return '\n'.join(hex_lines)
+
+
+def scan_markers(message):
+    """Позиции маркеров полей в сообщении.
+
+    Возвращает словарь маркер -> список позиций начала: первое вхождение
+    'windsurf' (без учета регистра) и не более двух первых вхождений остальных
+    маркеров. Каждая позиция ищется одним вызовом find на уровне C.
+    """
+    found = {}
+    match = WINDSURF_RE.search(message)
+    found[b'windsurf'] = [match.start()] if match else []
+    for marker in _FIELD_MARKERS:
+        first = message.find(marker)
+        if first < 0:
+            found[marker] = []
+            continue
+        second = message.find(marker, first + len(marker))
+        found[marker] = [first, second] if second >= 0 else [first]
+    return found
+
+
+def between(message, markers, marker):
+    """Текст между первым и вторым вхождением marker (как message.split(marker)[1]) или None.
+
+    markers - результат scan_markers для этого сообщения.
+    """
+    positions = markers[marker]
+    if not positions:
+        return None
+    start = positions[0] + len(marker)
+    return message[start:positions[1]] if len(positions) > 1 else message[start:]
+
+
+def field_text(raw):
+    """Декодирование извлеченного поля сообщения в строку."""
+    return raw.decode('utf-8', errors='ignore').strip()
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import sys
 import os
-import binascii
 import click
 from rich.console import Console
 from rich.table import Table
@@ -10,6 +9,7 @@ from rich.panel import Panel
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from datetime import datetime
+from _fastpath import WINDSURF_RE, between, field_text, hex_dump, hex_escape_decode, scan_markers, strip_quotes
 
 console = Console()
 
@@ -19,13 +19,7 @@ class WindsurfDecryptor:
         
     def _hex_dump(self, data, offset=0):
         """Создание форматированного шестнадцатеричного дампа двоичных данных."""
-        hex_lines = []
-        for i in range(0, len(data), 16):
-            chunk = data[i:i+16]
-            hex_vals = ' '.join(f'{b:02x}' for b in chunk)
-            ascii_vals = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in chunk)
-            hex_lines.append(f'{i+offset:04x}: {hex_vals:<48} {ascii_vals}')
-        return '\n'.join(hex_lines)
+        return hex_dump(data, offset)
 
     def _parse_message(self, data):
         """Разбор сообщения Windsurf на компоненты."""
@@ -37,38 +31,39 @@ class WindsurfDecryptor:
             # Разделить сообщение на компоненты
             parts = {}
             
-            # Преобразовать в строку для разбора
-            try:
-                message = data.decode('utf-8', errors='ignore')
-            except:
-                message = data.decode('latin1', errors='ignore')
+            # Маркеры ищутся прямо в байтах, декодируются только извлеченные поля
+            message = data
+
+            # Позиции всех маркеров за один проход по сообщению
+            markers = scan_markers(message)
 
             # Извлечь версию клиента и ID сессии
-            if 'windsurf' in message.lower():
-                parts['client_version'] = message.split('$')[0].strip()
-                if '$' in message:
-                    session_part = message.split('$')[1]
-                    if '"' in session_part:
-                        parts['session_id'] = session_part.split('"')[0].strip()
+            if markers[b'windsurf']:
+                dollars = markers[b'$']
+                parts['client_version'] = field_text(message[:dollars[0]] if dollars else message)
+                session_part = between(message, markers, b'$')
+                if session_part is not None:
+                    session_id, quote, _ = session_part.partition(b'"')
+                    if quote:
+                        parts['session_id'] = field_text(session_id)
 
             # Извлечь язык и версию
-            if 'en:' in message:
-                lang_part = message.split('en:')[1]
-                if ' ' in lang_part:
-                    parts['version'] = lang_part.split(' ')[0].strip()
+            lang_part = between(message, markers, b'en:')
+            if lang_part is not None:
+                version, space, _ = lang_part.partition(b' ')
+                if space:
+                    parts['version'] = field_text(version)
                     parts['language'] = 'ru'
 
             # Извлечь ID машины
-            if 'R$' in message:
-                machine_part = message.split('R$')[1]
-                if 'windsurf' in machine_part.lower():
-                    parts['machine_id'] = machine_part.split('windsurf')[0].strip()
+            machine_part = between(message, markers, b'R$')
+            if machine_part is not None and WINDSURF_RE.search(machine_part):
+                parts['machine_id'] = field_text(machine_part.partition(b'windsurf')[0])
 
             # Извлечь путь установки
-            if 'Program Files' in message:
-                path_parts = message.split('Program Files')[1:]
-                if path_parts:
-                    parts['installation_path'] = 'C:\\Program Files' + path_parts[0].split('\x00')[0]
+            path_part = between(message, markers, b'Program Files')
+            if path_part is not None:
+                parts['installation_path'] = 'C:\\Program Files' + path_part.partition(b'\x00')[0].decode('utf-8', errors='ignore')
 
             return parts
             
@@ -82,29 +77,10 @@ class WindsurfDecryptor:
             if isinstance(data, str):
                 try:
                     # Удалить кавычки и пробелы
-                    data = data.strip().strip("'").strip('"').strip()
+                    data = strip_quotes(data)
                     
-                    # Обработка формата с экранированным шестнадцатеричным кодом
-                    if '\\x' in data:
-                        # Разделить по \x и отфильтровать пустые части
-                        hex_parts = [p for p in data.split('\\x') if p]
-                        # Преобразовать каждую часть в байты
-                        bytes_parts = []
-                        for part in hex_parts:
-                            if len(part) >= 2:
-                                # Первые два символа - шестнадцатеричные, остальное - буквальное
-                                try:
-                                    bytes_parts.append(bytes.fromhex(part[:2]))
-                                    if len(part) > 2:
-                                        bytes_parts.append(part[2:].encode('latin1'))
-                                except:
-                                    bytes_parts.append(part.encode('latin1'))
-                            else:
-                                bytes_parts.append(part.encode('latin1'))
-                        data = b''.join(bytes_parts)
-                    else:
-                        # Обработать как необработанную строку
-                        data = data.encode('latin1')
+                    # Заменить экранированные \xNN на байты, остальное - буквально
+                    data = hex_escape_decode(data)
                 except Exception as e:
                     console.print(f"[yellow]Предупреждение: Ошибка при преобразовании в шестнадцатеричный формат: {e}[/yellow]")
                     data = data.encode('latin1')
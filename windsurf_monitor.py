@@ -4,8 +4,14 @@ import os
 import time
 import json
 import logging
+import queue
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from pathlib import Path
 import click
@@ -19,6 +25,7 @@ from rich import box
 from rich.text import Text
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from _fastpath import WINDSURF_RE, between, field_text, hex_dump, hex_escape_decode, scan_markers, strip_quotes
 
 console = Console()
 
@@ -57,6 +64,7 @@ class Config:
                 "api": {
                     "enabled": False,
                     "endpoint": "",
+                    "batch_endpoint": "",
                     "api_key": "",
                     "headers": {
                         "Content-Type": "application/json",
@@ -85,31 +93,43 @@ class Config:
         self.save_config()
 
 class WindsurfMessage:
+    __slots__ = ('raw_data', 'timestamp', 'parsed_data', 'hex_dump', 'api_sent', '_view_cache')
+
     def __init__(self, raw_data):
         self.raw_data = raw_data
         self.timestamp = datetime.now()
         self.parsed_data = {}
         self.hex_dump = ""
         self.api_sent = False
+        # (api_sent, sections): представление вместе со статусом API, с которым оно построено
+        self._view_cache = None
         
     def __str__(self):
         return f"{self.timestamp.isoformat()} - {self.parsed_data.get('client_version', 'Unknown')}"
         
-    def to_dict(self):
+    def to_dict(self, include_raw=True):
         """Преобразование сообщения в словарь для передачи по API."""
-        return {
+        result = {
             "timestamp": self.timestamp.isoformat(),
             "parsed_data": self.parsed_data,
-            "hex_dump": self.hex_dump,
-            "raw_data": self.raw_data.hex() if isinstance(self.raw_data, bytes) else self.raw_data
+            "hex_dump": self.hex_dump
         }
+        if include_raw:
+            result["raw_data"] = self.raw_data.hex() if isinstance(self.raw_data, bytes) else self.raw_data
+        return result
 
     def get_detailed_view(self):
         """Генерация подробного представления сообщения для отображения."""
+        # api_sent меняется фоновым потоком - читаем его один раз и сверяем с кэшем
+        api_sent = self.api_sent
+        cached = self._view_cache
+        if cached is not None and cached[0] == api_sent:
+            return cached[1]
+
         sections = [
             ("Информация о сообщении", [
                 ("Время", self.timestamp.strftime("%Y-%m-%d %H:%M:%S")),
-                ("Статус API", "Отправлено ✓" if self.api_sent else "Не отправлено ✗")
+                ("Статус API", "Отправлено ✓" if api_sent else "Не отправлено ✗")
             ]),
             ("Данные клиента", [
                 ("Версия клиента", self.parsed_data.get('client_version', 'Неизвестно')),
@@ -126,27 +146,48 @@ class WindsurfMessage:
                 ("Магический заголовок", "Присутствует" if self.raw_data.startswith(b'\xC1\x0A') else "Отсутствует")
             ])
         ]
+        # parsed_data после process_message не меняется, поэтому представление можно переиспользовать
+        self._view_cache = (api_sent, sections)
         return sections
 
 class APIClient:
+    JSON_HEADERS = {"Content-Type": "application/json"}
+
     def __init__(self, config):
         self.config = config
         self.session = requests.Session()
-        if config.config["api"]["api_key"]:
+        # Одно постоянное соединение к API; повтор только при ошибках подключения
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, read=0, backoff_factor=0.5)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.apply_config()
+
+    def apply_config(self):
+        """Применение текущей конфигурации API к клиенту."""
+        api = self.config.config["api"]
+        self._enabled = api["enabled"]
+        self._endpoint = api["endpoint"]
+        self._batch_endpoint = api.get("batch_endpoint", "")
+        if api["api_key"]:
             self.session.headers.update({
-                "Authorization": f"Bearer {config.config['api']['api_key']}"
+                "Authorization": f"Bearer {api['api_key']}"
             })
-        self.session.headers.update(config.config["api"]["headers"])
+        self.session.headers.update(api["headers"])
         
     def send_message(self, message):
         """Отправка сообщения на настроенный конечный API."""
-        if not self.config.config["api"]["enabled"]:
+        if not self._enabled:
             return False
             
         try:
             response = self.session.post(
-                self.config.config["api"]["endpoint"],
-                json=message.to_dict()
+                self._endpoint,
+                data=orjson.dumps(message.to_dict()),
+                headers=self.JSON_HEADERS
             )
             response.raise_for_status()
             return True
@@ -154,24 +195,68 @@ class APIClient:
             logging.error(f"Не удалось отправить сообщение по API: {e}")
             return False
 
+    def send_messages(self, messages):
+        """Отправка нескольких сообщений: одним JSON-массивом, если настроен batch_endpoint."""
+        if not self._enabled:
+            return [False] * len(messages)
+        if not self._batch_endpoint or len(messages) == 1:
+            return [self.send_message(message) for message in messages]
+
+        try:
+            response = self.session.post(
+                self._batch_endpoint,
+                data=orjson.dumps([message.to_dict() for message in messages]),
+                headers=self.JSON_HEADERS
+            )
+            response.raise_for_status()
+            return [True] * len(messages)
+        except Exception as e:
+            logging.error(f"Не удалось отправить пакет сообщений по API: {e}")
+            return [False] * len(messages)
+
 class WindsurfDecryptor:
-    def __init__(self, config):
+    IO_BATCH_SIZE = 32
+
+    def __init__(self, config, log_to_stderr=False):
         self.config = config
         self.magic_header = b'\xC1\x0A'
         self.output_dir = Path(config.config["monitoring"]["output_directory"])
         self.output_dir.mkdir(exist_ok=True)
-        self.messages = []
+        self.messages = deque(maxlen=config.config["monitoring"]["max_history"])
+        # Номер ревизии истории: увеличивается при любом изменении сообщений
+        self._rev = 0
+        self._rev_lock = threading.Lock()
+        self._changed = threading.Event()
         self.api_client = APIClient(config)
-        self.setup_logging()
+        self.apply_config()
+        self.setup_logging(log_to_stderr)
+        # Журнал сообщений NDJSON, открытый на текущий час (используется только потоком ввода-вывода)
+        self._log_file = None
+        self._log_hour = None
+        self._io_q = queue.Queue()
+        threading.Thread(target=self._io_worker, daemon=True).start()
+
+    def apply_config(self):
+        """Кэширование часто используемых параметров конфигурации."""
+        monitoring = self.config.config["monitoring"]
+        self._save_to_disk = monitoring["save_to_disk"]
+        self._max_history = monitoring["max_history"]
+        self._api_enabled = self.config.config["api"]["enabled"]
+        if self.messages.maxlen != self._max_history:
+            self.messages = deque(self.messages, maxlen=self._max_history)
+        self.api_client.apply_config()
         
-    def setup_logging(self):
-        """Настройка конфигурации логирования."""
+    def setup_logging(self, log_to_stderr=False):
+        """Настройка конфигурации логирования.
+
+        log_to_stderr направляет вывод журнала в stderr, оставляя stdout для данных.
+        """
         log_file = self.output_dir / "windsurf_decryptor.log"
         logging.basicConfig(
             level=logging.INFO,
             format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
             handlers=[
-                RichHandler(rich_tracebacks=True),
+                RichHandler(rich_tracebacks=True, console=Console(stderr=True) if log_to_stderr else None),
                 logging.FileHandler(log_file)
             ]
         )
@@ -179,56 +264,48 @@ class WindsurfDecryptor:
 
     def _hex_dump(self, data, offset=0):
         """Создание отформатированного дампа в шестнадцатеричном формате из двоичных данных."""
-        hex_lines = []
-        for i in range(0, len(data), 16):
-            chunk = data[i:i+16]
-            hex_vals = ' '.join(f'{b:02x}' for b in chunk)
-            ascii_vals = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in chunk)
-            hex_lines.append(f'{i+offset:04x}: {hex_vals:<48} {ascii_vals}')
-        return '\n'.join(hex_lines)
+        return hex_dump(data, offset)
 
     def _parse_message(self, data):
         """Разбор Windsurf сообщения на его компоненты."""
         try:
-            # Преобразование данных в строку, если они в байтах
-            if isinstance(data, bytes):
-                try:
-                    message = data.decode('utf-8', errors='ignore')
-                except:
-                    message = data.decode('latin1', errors='ignore')
-            else:
-                message = data
+            # Маркеры ищутся прямо в байтах, декодируются только извлеченные поля
+            message = data if isinstance(data, bytes) else data.encode('utf-8')
 
             parts = {}
 
+            # Позиции всех маркеров за один проход по сообщению
+            markers = scan_markers(message)
+
             # Извлечение версии клиента и ID сессии
-            if 'windsurf' in message.lower():
-                parts['client_version'] = message.split('$')[0].strip()
-                if '$' in message:
-                    session_part = message.split('$')[1]
-                    if '"' in session_part:
-                        parts['session_id'] = session_part.split('"')[0].strip()
+            if markers[b'windsurf']:
+                dollars = markers[b'$']
+                parts['client_version'] = field_text(message[:dollars[0]] if dollars else message)
+                session_part = between(message, markers, b'$')
+                if session_part is not None:
+                    session_id, quote, _ = session_part.partition(b'"')
+                    if quote:
+                        parts['session_id'] = field_text(session_id)
 
             # Извлечение языка и версии
-            if 'en:' in message:
-                lang_part = message.split('en:')[1]
-                if ' ' in lang_part:
-                    parts['version'] = lang_part.split(' ')[0].strip()
+            lang_part = between(message, markers, b'en:')
+            if lang_part is not None:
+                version, space, _ = lang_part.partition(b' ')
+                if space:
+                    parts['version'] = field_text(version)
                     parts['language'] = 'ru'
             else:
                 parts['language'] = 'ru'
 
             # Извлечение ID машины
-            if 'R$' in message:
-                machine_part = message.split('R$')[1]
-                if 'windsurf' in machine_part.lower():
-                    parts['machine_id'] = machine_part.split('windsurf')[0].strip()
+            machine_part = between(message, markers, b'R$')
+            if machine_part is not None and WINDSURF_RE.search(machine_part):
+                parts['machine_id'] = field_text(machine_part.partition(b'windsurf')[0])
 
             # Извлечение пути установки
-            if 'Program Files' in message:
-                path_parts = message.split('Program Files')[1:]
-                if path_parts:
-                    parts['installation_path'] = 'C:\\Program Files' + path_parts[0].split('\x00')[0]
+            path_part = between(message, markers, b'Program Files')
+            if path_part is not None:
+                parts['installation_path'] = 'C:\\Program Files' + path_part.partition(b'\x00')[0].decode('utf-8', errors='ignore')
 
             return parts
         except Exception as e:
@@ -243,23 +320,8 @@ class WindsurfDecryptor:
             # Обработка различных форматов ввода
             if isinstance(data, str):
                 try:
-                    data = data.strip().strip("'").strip('"').strip()
-                    if '\\x' in data:
-                        hex_parts = [p for p in data.split('\\x') if p]
-                        bytes_parts = []
-                        for part in hex_parts:
-                            if len(part) >= 2:
-                                try:
-                                    bytes_parts.append(bytes.fromhex(part[:2]))
-                                    if len(part) > 2:
-                                        bytes_parts.append(part[2:].encode('latin1'))
-                                except:
-                                    bytes_parts.append(part.encode('latin1'))
-                            else:
-                                bytes_parts.append(part.encode('latin1'))
-                        data = b''.join(bytes_parts)
-                    else:
-                        data = data.encode('latin1')
+                    data = strip_quotes(data)
+                    data = hex_escape_decode(data)
                 except Exception as e:
                     self.logger.warning(f"Ошибка при преобразовании в hex: {e}")
                     data = data.encode('latin1')
@@ -268,18 +330,13 @@ class WindsurfDecryptor:
             message.hex_dump = self._hex_dump(data)
             message.parsed_data = self._parse_message(data)
             
-            # Сохранение сообщения в файл, если включено
-            if self.config.config["monitoring"]["save_to_disk"]:
-                self._save_message(message)
+            # Сохранение на диск и отправка в API выполняются в фоновом потоке
+            if self._save_to_disk or self._api_enabled:
+                self._io_q.put((message, self._save_to_disk, self._api_enabled))
             
-            # Отправка в API, если настроено
-            if self.config.config["api"]["enabled"]:
-                message.api_sent = self.api_client.send_message(message)
-            
-            # Добавление сообщения в историю сообщений
+            # Добавление сообщения в историю сообщений (старые вытесняются автоматически)
             self.messages.append(message)
-            if len(self.messages) > self.config.config["monitoring"]["max_history"]:
-                self.messages.pop(0)
+            self._mark_changed()
                 
             return message
 
@@ -287,14 +344,79 @@ class WindsurfDecryptor:
             self.logger.error(f"Ошибка при обработке сообщения: {e}")
             return None
 
+    def _io_worker(self):
+        """Фоновый поток: сохранение сообщений на диск и отправка в API пакетами."""
+        while True:
+            # Забрать все накопившиеся сообщения, но не больше IO_BATCH_SIZE за раз
+            batch = [self._io_q.get()]
+            try:
+                while len(batch) < self.IO_BATCH_SIZE:
+                    batch.append(self._io_q.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                to_send = []
+                for message, save, send in batch:
+                    if save:
+                        self._save_message(message)
+                    if send:
+                        to_send.append(message)
+                # Один сброс буфера журнала на всю пачку
+                if self._log_file is not None:
+                    self._log_file.flush()
+                if to_send:
+                    for message, sent in zip(to_send, self.api_client.send_messages(to_send)):
+                        message.api_sent = sent
+                    self._mark_changed()
+            except Exception as e:
+                self.logger.error(f"Ошибка фоновой обработки сообщений: {e}")
+            finally:
+                for _ in batch:
+                    self._io_q.task_done()
+
+    def _mark_changed(self):
+        """Отметка изменения истории сообщений для интерфейса."""
+        # Вызывается из потока чтения файлов и из потока ввода-вывода
+        with self._rev_lock:
+            self._rev += 1
+        self._changed.set()
+
+    @property
+    def revision(self):
+        """Номер ревизии истории сообщений; меняется при каждом ее изменении."""
+        return self._rev
+
+    def wait_for_change(self, timeout=None):
+        """Ожидание изменения истории сообщений не дольше timeout секунд."""
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+    def flush(self):
+        """Ожидание завершения всех отложенных сохранений и отправок."""
+        self._io_q.join()
+
+    def close(self):
+        """Завершение отложенной работы и закрытие журнала сообщений."""
+        self.flush()
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+            self._log_hour = None
+
     def _save_message(self, message):
-        """Сохранение сообщения в файл JSON."""
+        """Дописывание сообщения строкой JSON в журнал текущего часа."""
         try:
-            timestamp = message.timestamp.strftime("%Y%m%d_%H%M%S")
-            filename = self.output_dir / f"message_{timestamp}.json"
-            
-            with open(filename, 'w') as f:
-                json.dump(message.to_dict(), f, indent=2)
+            hour = message.timestamp.strftime("%Y%m%d_%H")
+            if hour != self._log_hour:
+                if self._log_file is not None:
+                    self._log_file.close()
+                self._log_file = open(self.output_dir / f"messages_{hour}.ndjson", 'ab', buffering=1 << 16)
+                self._log_hour = hour
+
+            # Необработанные данные на диске не нужны: они полностью есть в hex_dump
+            self._log_file.write(orjson.dumps(message.to_dict(include_raw=False)) + b'\n')
                 
         except Exception as e:
             self.logger.error(f"Ошибка при сохранении сообщения: {e}")
@@ -327,6 +449,8 @@ class WindsurfMonitor:
         self.decryptor = decryptor
         self.layout = Layout()
         self._setup_layout()
+        self._last_rev = -1
+        self._banner_second = None
         
     def _setup_layout(self):
         """Настройка макета пользовательского интерфейса терминала."""
@@ -355,7 +479,7 @@ class WindsurfMonitor:
         table.add_column("ID сессии", style="yellow")
         table.add_column("API", style="magenta")
         
-        for msg in self.decryptor.messages[-10:]:
+        for msg in list(self.decryptor.messages)[-10:]:
             api_status = "[green]✓[/green]" if msg.api_sent else "[red]✗[/red]"
             table.add_row(
                 msg.timestamp.strftime("%H:%M:%S"),
@@ -383,23 +507,85 @@ class WindsurfMonitor:
 
     def update_display(self):
         """Обновление отображения с текущими данными."""
-        self.layout["banner"].update(self._generate_banner())
-        self.layout["messages"].update(self._generate_message_table())
-        if self.decryptor.messages:
-            self.layout["details"].update(self._generate_details(self.decryptor.messages[-1]))
+        # Баннер показывает время с точностью до секунды
+        second = int(time.time())
+        if second != self._banner_second:
+            self._banner_second = second
+            self.layout["banner"].update(self._generate_banner())
+
+        # Таблицы перестраиваются только при изменении истории сообщений
+        rev = self.decryptor.revision
+        if rev != self._last_rev:
+            self._last_rev = rev
+            self.layout["messages"].update(self._generate_message_table())
+            if self.decryptor.messages:
+                self.layout["details"].update(self._generate_details(self.decryptor.messages[-1]))
         return self.layout
 
 class MessageWatcher(FileSystemEventHandler):
-    def __init__(self, monitor):
+    READ_BATCH_SIZE = 32
+
+    def __init__(self, monitor, paths=None):
         self.monitor = monitor
+        self._paths = paths if paths is not None else queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=4)
+        threading.Thread(target=self._read_worker, daemon=True).start()
         
     def on_created(self, event):
         if event.is_directory:
             return
         if event.src_path.endswith('.msg'):
-            with open(event.src_path, 'rb') as f:
-                data = f.read()
-            self.monitor.decryptor.process_message(data)
+            # Чтение и разбор выполняются вне потока наблюдателя
+            self._paths.put(event.src_path)
+
+    def _read_worker(self):
+        """Фоновый поток: чтение новых файлов пачками и их обработка."""
+        while True:
+            paths = [self._paths.get()]
+            try:
+                while len(paths) < self.READ_BATCH_SIZE:
+                    paths.append(self._paths.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                for data in self._read_many(paths):
+                    if data is not None:
+                        self.monitor.decryptor.process_message(data)
+            finally:
+                for _ in paths:
+                    self._paths.task_done()
+
+    def stop(self):
+        """Ожидание чтения и обработки всех уже обнаруженных файлов."""
+        self._paths.join()
+        self._pool.shutdown()
+
+    def _read_many(self, paths):
+        """Параллельное чтение нескольких файлов с сохранением порядка."""
+        if len(paths) == 1:
+            return [self._read_file(paths[0])]
+        return list(self._pool.map(self._read_file, paths))
+
+    def _read_file(self, path):
+        """Чтение файла сообщения напрямую через дескриптор, без буферизованного ввода-вывода."""
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                # Обычно файл читается целиком за один вызов read по размеру из fstat
+                size = os.fstat(fd).st_size or 65536
+                chunks = []
+                while True:
+                    chunk = os.read(fd, size)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                return b''.join(chunks)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            self.monitor.decryptor.logger.error(f"Ошибка при чтении файла {path}: {e}")
+            return None
 
 @click.group()
 def cli():
@@ -428,16 +614,46 @@ def decrypt(input_data, file, output_dir, api_endpoint, api_key):
             data = input_data
 
         message = decryptor.process_message(data)
+        decryptor.close()
         if message:
-            if config.config["api"]["enabled"]:
-                message.api_sent = decryptor.api_client.send_message(message)
-            
             display_decrypted_message(message)
             
     except Exception as e:
         console.print(f"[red]Ошибка: {str(e)}[/red]")
         sys.exit(1)
 
+@cli.command()
+@click.option('--api-endpoint', help='Конечная точка API для отправки расшифрованных сообщений')
+@click.option('--api-key', help='Ключ API для аутентификации')
+def daemon(api_endpoint, api_key):
+    """Расшифровка потока сообщений из stdin, по одному на строку.
+
+    Конфигурация, клиент API и декриптор создаются один раз на весь поток.
+    На каждую строку ввода в stdout выводится ровно одна строка JSON: разобранные
+    данные или {"error": ...}, если сообщение обработать не удалось. Журнал
+    пишется в stderr, чтобы не смешиваться с результатами.
+    """
+    config = Config()
+    if api_endpoint:
+        config.update_api_config(api_endpoint, api_key)
+
+    decryptor = WindsurfDecryptor(config, log_to_stderr=True)
+    out = sys.stdout.buffer
+
+    try:
+        for line in sys.stdin:
+            message = decryptor.process_message(line)
+            if message:
+                record = message.parsed_data
+            else:
+                record = {"error": "Не удалось обработать сообщение"}
+            out.write(orjson.dumps(record) + b'\n')
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        decryptor.close()
+
 @cli.command()
 @click.option('--watch-dir', '-w', default='.', help='Каталог для отслеживания новых сообщений')
 @click.option('--output-dir', '-o', default='logs', help='Каталог для сохранения выходных файлов')
@@ -458,17 +674,22 @@ def monitor(watch_dir, output_dir, api_endpoint, api_key):
     
     # Setup file system observer
     observer = Observer()
-    observer.schedule(MessageWatcher(monitor), watch_dir, recursive=False)
+    watcher = MessageWatcher(monitor)
+    observer.schedule(watcher, watch_dir, recursive=False)
     observer.start()
     
     try:
-        with Live(monitor.update_display(), refresh_per_second=4) as live:
+        # Перерисовка по событию от декриптора; таймаут нужен для часов в баннере
+        with Live(monitor.update_display(), auto_refresh=False) as live:
             while True:
-                time.sleep(0.25)
-                live.update(monitor.update_display())
+                decryptor.wait_for_change(timeout=1.0)
+                live.update(monitor.update_display(), refresh=True)
     except KeyboardInterrupt:
         observer.stop()
         observer.join()
+        # Сначала дочитать обнаруженные файлы, затем дождаться их сохранения и отправки
+        watcher.stop()
+        decryptor.close()
 
 @cli.command()
 @click.argument('endpoint')